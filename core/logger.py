@@ -1,69 +1,110 @@
+import atexit
 import logging
 import logging.config
+import logging.handlers
 import os
+import queue
+import time
 
 path = os.path.abspath(__file__)
 BASE_DIR = os.path.dirname(os.path.dirname(path))
 
 
+class formatter(logging.Formatter):
+    # 同一秒内的日志复用已格式化好的时间字符串，只拼接毫秒部分
+    _cache = (None, None)
+
+    def formatTime(self, record, datefmt=None):
+        if datefmt:
+            return super().formatTime(record, datefmt)
+        sec = int(record.created)
+        cached_sec, cached_time = self._cache
+        if cached_sec != sec:
+            cached_time = time.strftime(self.default_time_format, self.converter(record.created))
+            self._cache = (sec, cached_time)
+        return self.default_msec_format % (cached_time, record.msecs)
+
+
 class logger(object):
+    _configured = False
+
     def __init__(self,base_dir):
-        logging_config = {
-            # 必选项，其值是一个整数值，表示配置格式的版本，当前唯一可用的值就是1
-            'version': 1,
-            # 是否禁用现有的记录器
-            'disable_existing_loggers': False,
+        # 日志配置在进程内只加载一次，各模块导入时不再重复创建处理器
+        if not logger._configured:
+            logging_config = {
+                # 必选项，其值是一个整数值，表示配置格式的版本，当前唯一可用的值就是1
+                'version': 1,
+                # 是否禁用现有的记录器
+                'disable_existing_loggers': False,
 
-            # 过滤器
-            # 'filters': {
-            #     'require_debug_true': {
-            #         '()': RequireDebugTrue,  # 在开发环境，我设置DEBUG为True；在客户端，我设置DEBUG为False。从而控制是否需要使用某些处理器。
-            #     }
-            # },
+                # 过滤器
+                # 'filters': {
+                #     'require_debug_true': {
+                #         '()': RequireDebugTrue,  # 在开发环境，我设置DEBUG为True；在客户端，我设置DEBUG为False。从而控制是否需要使用某些处理器。
+                #     }
+                # },
 
-            # 日志格式集合
-            'formatters': {
-                'simple': {
-                    'format': '%(asctime)s - %(pathname)s[line:%(lineno)d] - %(levelname)s: %(message)s',
+                # 日志格式集合
+                'formatters': {
+                    'simple': {
+                        '()': formatter,
+                        'format': '%(asctime)s - %(pathname)s[line:%(lineno)d] - %(levelname)s: %(message)s',
+                    },
                 },
-            },
 
-            # 处理器集合
-            'handlers': {
-                # 输出到控制台
-                'console': {
-                    'level': 'DEBUG',  # 输出信息的最低级别
-                    'class': 'logging.StreamHandler',
-                    'formatter': 'simple',  # 使用standard格式
-                    # 'filters': ['require_debug_true', ]
+                # 处理器集合
+                'handlers': {
+                    # 输出到控制台
+                    'console': {
+                        'level': 'DEBUG',  # 输出信息的最低级别
+                        'class': 'logging.StreamHandler',
+                        'formatter': 'simple',  # 使用standard格式
+                        # 'filters': ['require_debug_true', ]
+                    },
+                    # 输出到文件
+                    'log': {
+                        'level': 'DEBUG',
+                        'class': 'logging.handlers.RotatingFileHandler',
+                        'formatter': 'simple',
+                        #'filename': os.path.join(BASE_DIR + "\\log", 'info.log'),  # 输出位置
+                        'filename': os.path.join(base_dir, 'info.log'),  # 输出位置
+                        'maxBytes': 1024 * 1024 * 5,  # 文件大小 5M
+                        'backupCount': 5,  # 备份份数
+                        'encoding': 'utf8',  # 文件编码
+                    },
                 },
-                # 输出到文件
-                'log': {
-                    'level': 'DEBUG',
-                    'class': 'logging.handlers.RotatingFileHandler',
-                    'formatter': 'simple',
-                    #'filename': os.path.join(BASE_DIR + "\\log", 'info.log'),  # 输出位置
-                    'filename': os.path.join(base_dir, 'info.log'),  # 输出位置
-                    'maxBytes': 1024 * 1024 * 5,  # 文件大小 5M
-                    'backupCount': 5,  # 备份份数
-                    'encoding': 'utf8',  # 文件编码
-                },
-            },
 
-            # 日志管理器集合
-            'loggers': {
-                'root': {
-                    'handlers': ['console', 'log'],
-                    'level': 'DEBUG',
-                    'propagate': True,  # 是否传递给父记录器
-                },
-                'simple': {
-                    'handlers': ['console', 'log'],
-                    'level': 'WARN',
-                    'propagate': True,  # 是否传递给父记录器,
+                # 日志管理器集合
+                'loggers': {
+                    'root': {
+                        'handlers': ['console', 'log'],
+                        'level': 'DEBUG',
+                        'propagate': True,  # 是否传递给父记录器
+                    },
+                    'simple': {
+                        'handlers': ['console', 'log'],
+                        'level': 'WARN',
+                        'propagate': True,  # 是否传递给父记录器,
+                    }
                 }
             }
-        }
 
-        logging.config.dictConfig(logging_config)
+            logging.config.dictConfig(logging_config)
+
+            # 写文件交给后台线程，打日志的线程只负责入队，不再阻塞在磁盘 IO 上
+            log_queue = queue.SimpleQueue()
+            queue_handler = logging.handlers.QueueHandler(log_queue)
+            file_handler = None
+            for name in logging_config['loggers']:
+                for handler in list(logging.getLogger(name).handlers):
+                    if handler.get_name() == 'log':
+                        file_handler = handler
+                        logging.getLogger(name).removeHandler(handler)
+                        logging.getLogger(name).addHandler(queue_handler)
+            if file_handler is not None:
+                listener = logging.handlers.QueueListener(log_queue, file_handler, respect_handler_level=True)
+                listener.start()
+                atexit.register(listener.stop)
+
+            logger._configured = True
         self.logger = logging.getLogger('root')
@@ -1,12 +1,10 @@
 import json, os
-import time
 
 from core.logger import logger
 from core.windows import windows
 from core.picture import picture
 from core.mouse import mouse
-import win32gui,win32api,win32con
-import ctypes,random
+import random
 
 path = os.path.abspath(__file__)
 BASE_DIR = os.path.dirname(os.path.dirname(path))
@@ -49,4 +47,5 @@ def main():
     pic.capture_the_currentscreen2()
 
 
-main()
+if __name__ == '__main__':
+    main()
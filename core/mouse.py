@@ -1,6 +1,6 @@
 from core.logger import logger
 import os, threading
-import win32gui, win32con, win32api, win32ui
+import win32gui, win32con, win32api
 import time,random
 
 path = os.path.abspath(__file__)
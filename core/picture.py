@@ -9,12 +9,34 @@ BASE_DIR = os.path.dirname(os.path.dirname(path))
 log = logger(BASE_DIR).logger
 
 
+class snapshot:
+    # 一次截图的快照：BGR 图像、灰度图以及这一帧上的模板匹配结果，截图时整体替换
+    def __init__(self, img, seq=0):
+        self.img = img
+        # 截图序号，越大越新
+        self.seq = seq
+        self.gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+        # 各模板的匹配结果 {路径: (max_val, max_loc)}
+        self.matches = {}
+
+
 class picture:
     def __init__(self, hwnd, base_dir):
         self._hwnd = hwnd
         self._pic = None
+        # 当前截图快照，保留在内存中，避免再从磁盘解码 PNG；调用方每次只取一次引用
+        self._snapshot = None
         self.lock = threading.Lock()
         self.base_dir = base_dir
+        # 截图序号，在 self.lock 内递增
+        self._seq = 0
+        # 写截图文件的锁，以及已写入文件的最新截图序号
+        self._write_lock = threading.Lock()
+        self._written_seq = 0
+        # 模板图缓存 {路径: 灰度图}，避免每次匹配都重新解码 PNG
+        self._templates = {}
+        # matchTemplate 结果缓冲区，每个线程各一块，尺寸不变时复用同一块内存
+        self._local = threading.local()
 
     def check_window_handle(self):
         if self._hwnd == 0:
@@ -23,6 +45,38 @@ class picture:
         else:
             return 1
 
+    def load_template(self, matchedPicture):
+        # 模板图只解码一次，之后直接从缓存中取灰度图
+        template = self._templates.get(matchedPicture)
+        if template is None:
+            imobj = cv2.imread(matchedPicture)
+            if imobj is None:
+                return None
+            template = cv2.cvtColor(imobj, cv2.COLOR_BGR2GRAY)
+            self._templates[matchedPicture] = template
+        return template
+
+    def load_snapshot(self):
+        return self._snapshot
+
+    def match_template(self, snap, imobj_gray, matchedPicture):
+        # 同一张截图上同一模板只做一次 matchTemplate，多个页面共用模板时直接复用结果
+        # 结果只写回计算它的那一帧，不会串到之后的截图上
+        match = snap.matches.get(matchedPicture)
+        if match is None:
+            imsrc_gray = snap.gray
+            size = (imsrc_gray.shape[0] - imobj_gray.shape[0] + 1, imsrc_gray.shape[1] - imobj_gray.shape[1] + 1)
+            result = getattr(self._local, 'result', None)
+            if result is None or result.shape != size:
+                result = np.empty(size, dtype=np.float32)
+            # 以返回值为准：OpenCV 若重新分配了输出数组，缓冲区也随之更新
+            result = cv2.matchTemplate(imsrc_gray, imobj_gray, cv2.TM_CCOEFF_NORMED, result)
+            self._local.result = result
+            min_val, max_val, min_loc, max_loc = cv2.minMaxLoc(result)
+            match = (max_val, max_loc)
+            snap.matches[matchedPicture] = match
+        return match
+
     def match_the_picture(self, matchedPicture, confidence=0.6):
         if self._pic is None:
             log.warning("current picture not found! errCode: 11001")
@@ -31,23 +85,19 @@ class picture:
             log.warning("matched picture not found! errCode: 11002")
             return None
 
-        # 使用 OpenCV 读取图片
-        imsrc = cv2.imread(self._pic)
-        imobj = cv2.imread(matchedPicture)
-
-        # 转为灰度图
-        imsrc_gray = cv2.cvtColor(imsrc, cv2.COLOR_BGR2GRAY)
-        imobj_gray = cv2.cvtColor(imobj, cv2.COLOR_BGR2GRAY)
+        # 读取灰度图，整个匹配过程只使用这一帧
+        snap = self.load_snapshot()
+        imsrc_gray = snap.gray
+        imobj_gray = self.load_template(matchedPicture)
 
         # 模板匹配
-        result = cv2.matchTemplate(imsrc_gray, imobj_gray, cv2.TM_CCOEFF_NORMED)
-        min_val, max_val, min_loc, max_loc = cv2.minMaxLoc(result)
+        max_val, max_loc = self.match_template(snap, imobj_gray, matchedPicture)
 
         if max_val >= confidence:
             match_result = {
                 'confidence': max_val,
                 'result': max_loc,
-                'shape': (imsrc.shape[1], imsrc.shape[0])
+                'shape': (imsrc_gray.shape[1], imsrc_gray.shape[0])
             }
             return match_result
         else:
@@ -62,21 +112,18 @@ class picture:
             return None
 
         try:
-            # 使用 OpenCV 读取图片
-            imsrc = cv2.imread(self._pic)
-            imobj = cv2.imread(matchedPicture)
+            # 读取灰度图，整个匹配过程只使用这一帧
+            snap = self.load_snapshot()
+            imobj_gray = self.load_template(matchedPicture)
 
             # 检查图像是否成功加载
-            if imsrc is None:
+            if snap is None:
                 log.warning("Failed to load source image! errCode: 11003")
                 return None
-            if imobj is None:
+            if imobj_gray is None:
                 log.warning("Failed to load matched image! errCode: 11004")
                 return None
-
-            # 转为灰度图
-            imsrc_gray = cv2.cvtColor(imsrc, cv2.COLOR_BGR2GRAY)
-            imobj_gray = cv2.cvtColor(imobj, cv2.COLOR_BGR2GRAY)
+            imsrc_gray = snap.gray
 
             # 检查源图像是否足够大
             if imsrc_gray.shape[0] < imobj_gray.shape[0] or imsrc_gray.shape[1] < imobj_gray.shape[1]:
@@ -84,20 +131,19 @@ class picture:
                 return None
 
             # 模板匹配
-            result = cv2.matchTemplate(imsrc_gray, imobj_gray, cv2.TM_CCOEFF_NORMED)
-            min_val, max_val, min_loc, max_loc = cv2.minMaxLoc(result)
+            max_val, max_loc = self.match_template(snap, imobj_gray, matchedPicture)
 
             # 判断匹配的置信度
             if max_val >= confidence:
                 match_result = {
                     'confidence': max_val,
                     'result': max_loc,
-                    'shape': (imsrc.shape[1], imsrc.shape[0]),  # 原图的宽高
-                    'matched_shape': (imobj.shape[1], imobj.shape[0])  # 模板图的宽高
+                    'shape': (imsrc_gray.shape[1], imsrc_gray.shape[0]),  # 原图的宽高
+                    'matched_shape': (imobj_gray.shape[1], imobj_gray.shape[0])  # 模板图的宽高
                 }
 
                 # 计算右下角坐标
-                bottom_right = (max_loc[0] + imobj.shape[1], max_loc[1] + imobj.shape[0])
+                bottom_right = (max_loc[0] + imobj_gray.shape[1], max_loc[1] + imobj_gray.shape[0])
 
                 # 在源图像上绘制匹配区域
                 # cv2.rectangle(imsrc, max_loc, bottom_right, (0, 255, 0), 2)  # 用绿色矩形框选
@@ -113,12 +159,11 @@ class picture:
                     'confidence': max_val
                 }
             else:
-                log.warning("Matching confidence below threshold! Confidence: {:.2f}, Threshold: {:.2f}".format(max_val,
-                                                                                                                confidence))
+                log.warning("Matching confidence below threshold! Confidence: %.2f, Threshold: %.2f", max_val, confidence)
                 return None
 
         except Exception as e:
-            log.error("Error occurred during matching: {}".format(e))
+            log.error("Error occurred during matching: %s", e)
             return None
 
     def match_the_pages(self, pages):
@@ -127,92 +172,61 @@ class picture:
             img = entry['img']
             name = entry['name']
             pagePicUrl = os.path.join(os.path.join(BASE_DIR, "resource"), img)
-            print(pagePicUrl)
+            log.debug("matching page picture %s", pagePicUrl)
             rate = self.match_the_picture(pagePicUrl, float(entry["matching_rate"]))
-            log.info(name + " matching rate is " + str(rate))
+            log.info("%s matching rate is %s", name, rate)
             if rate is not None:
-                log.info("capture currentPage is " + name)
+                log.info("capture currentPage is %s", name)
                 return name
         return None
 
     def get_currentpoint(self, point):
         self.capture_the_currentscreen()
-        img = cv2.imread(self._pic)
+        img = self.load_snapshot().img
         result = img[point[1], point[0], 1]  # 获取 G 通道的值
-        log.info("OpenCV result : " + str(result))
+        log.info("OpenCV result : %s", result)
         return result
 
     def get_currentpointRGB(self, point):
         self.capture_the_currentscreen()
 
-        img = cv2.imread(self._pic)
+        img = self.load_snapshot().img
         result = img[point[1], point[0]]  # 获取 RGB 值
-        log.info("OpenCV result : " + str(result))
+        log.info("OpenCV result : %s", result)
         return result
 
-    def capture_the_currentscreen(self):  # 获取当前窗口截图并保存
-        self.lock.acquire()
-        if self.check_window_handle() == 1:
-
-            left, top, right, bot = win32gui.GetWindowRect(self._hwnd)
-            SW = right - left
-            SH = bot - top
-
-            # 获取窗口设备上下文
-            wDC = win32gui.GetWindowDC(self._hwnd)
-            dcObj = win32ui.CreateDCFromHandle(wDC)
-            saveDC = dcObj.CreateCompatibleDC()
-            saveBitMap = win32ui.CreateBitmap()
-            saveBitMap.CreateCompatibleBitmap(dcObj, SW, SH)
-            saveDC.SelectObject(saveBitMap)
-
-            # 截图保存到内存
-            saveDC.BitBlt((0, 0), (SW, SH), dcObj, (0, 0), win32con.SRCCOPY)
-
-            # 将截图转换为 OpenCV 格式
-            bmpinfo = saveBitMap.GetInfo()
-            bmpstr = saveBitMap.GetBitmapBits(True)
-            img = np.frombuffer(bmpstr, dtype='uint8')
-            img.shape = (bmpinfo['bmHeight'], bmpinfo['bmWidth'], 4)  # BGRA 格式
-
-            # BGRX 转换为 BGR 格式，适用于 OpenCV
-            img_bgr = cv2.cvtColor(img, cv2.COLOR_BGRA2BGR)
-
-            # 释放资源
-            win32gui.DeleteObject(saveBitMap.GetHandle())
-            saveDC.DeleteDC()
-            dcObj.DeleteDC()
-            win32gui.ReleaseDC(self._hwnd, wDC)
-
-            # 保存截图
-            cv2.imwrite(os.path.join(self.base_dir, 'current_screen.png'), img_bgr)
-            # cv2.imshow("Captured Image", img_bgr)
-            # cv2.waitKey(0)
-            # cv2.destroyAllWindows()
-            self._pic = os.path.join(self.base_dir, 'current_screen.png')
-            log.info('Capture the current screen...')
+    def save_snapshot(self, snap):
+        # 写文件放在截图锁外并单独串行化，已写入更新的帧时跳过旧帧
+        with self._write_lock:
+            if snap.seq <= self._written_seq:
+                return
+            if not cv2.imwrite(os.path.join(self.base_dir, 'current_screen.png'), snap.img,
+                               [cv2.IMWRITE_PNG_COMPRESSION, 1]):
+                log.warning("Failed to save the current screen! errCode: 11006")
+                return
+            self._written_seq = snap.seq
 
-        self.lock.release()
+    def capture_the_currentscreen(self):  # 获取当前窗口截图并保存
+        snap = None
+        # 锁只保护截图和当前帧的更新，写 PNG 放到锁外，避免磁盘 IO 阻塞其它线程
+        with self.lock:
+            if self.check_window_handle() == 1:
+
+                left, top, right, bot = win32gui.GetWindowRect(self._hwnd)
+                SW = right - left
+                SH = bot - top
+
+                # 获取窗口设备上下文
+                wDC = win32gui.GetWindowDC(self._hwnd)
+                dcObj = win32ui.CreateDCFromHandle(wDC)
+                saveDC = dcObj.CreateCompatibleDC()
+                saveBitMap = win32ui.CreateBitmap()
+                saveBitMap.CreateCompatibleBitmap(dcObj, SW, SH)
+                saveDC.SelectObject(saveBitMap)
+
+                # 截图保存到内存
+                saveDC.BitBlt((0, 0), (SW, SH), dcObj, (0, 0), win32con.SRCCOPY)
 
-    def capture_the_currentscreen2(self):
-        self.lock.acquire()
-        if self.check_window_handle() == 1:
-            left, top, right, bot = win32gui.GetWindowRect(self._hwnd)
-            SW = right - left
-            SH = bot - top
-
-            # 获取窗口设备上下文
-            wDC = win32gui.GetWindowDC(self._hwnd)
-            dcObj = win32ui.CreateDCFromHandle(wDC)
-            saveDC = dcObj.CreateCompatibleDC()
-            saveBitMap = win32ui.CreateBitmap()
-            saveBitMap.CreateCompatibleBitmap(dcObj, SW, SH)
-            saveDC.SelectObject(saveBitMap)
-
-            # 使用 PrintWindow 代替 BitBlt
-            result = win32api.PrintWindow(self._hwnd, saveDC.GetSafeHdc(), 0)
-
-            if result == 1:  # PrintWindow 成功
                 # 将截图转换为 OpenCV 格式
                 bmpinfo = saveBitMap.GetInfo()
                 bmpstr = saveBitMap.GetBitmapBits(True)
@@ -228,9 +242,63 @@ class picture:
                 dcObj.DeleteDC()
                 win32gui.ReleaseDC(self._hwnd, wDC)
 
-                # 保存截图
-                cv2.imwrite(os.path.join(self.base_dir, 'current_screen.png'), img_bgr)
                 self._pic = os.path.join(self.base_dir, 'current_screen.png')
-                log.info('Capture the current screen...')
-            else:
-                log.warning('Failed to capture the screen.')
\ No newline at end of file
+                self._seq += 1
+                snap = snapshot(img_bgr, self._seq)
+                self._snapshot = snap
+
+        if snap is not None:
+            # 保存截图
+            self.save_snapshot(snap)
+            # cv2.imshow("Captured Image", img_bgr)
+            # cv2.waitKey(0)
+            # cv2.destroyAllWindows()
+            log.info('Capture the current screen...')
+
+    def capture_the_currentscreen2(self):
+        snap = None
+        with self.lock:
+            if self.check_window_handle() == 1:
+                left, top, right, bot = win32gui.GetWindowRect(self._hwnd)
+                SW = right - left
+                SH = bot - top
+
+                # 获取窗口设备上下文
+                wDC = win32gui.GetWindowDC(self._hwnd)
+                dcObj = win32ui.CreateDCFromHandle(wDC)
+                saveDC = dcObj.CreateCompatibleDC()
+                saveBitMap = win32ui.CreateBitmap()
+                saveBitMap.CreateCompatibleBitmap(dcObj, SW, SH)
+                saveDC.SelectObject(saveBitMap)
+
+                # 使用 PrintWindow 代替 BitBlt
+                result = win32api.PrintWindow(self._hwnd, saveDC.GetSafeHdc(), 0)
+
+                if result == 1:  # PrintWindow 成功
+                    # 将截图转换为 OpenCV 格式
+                    bmpinfo = saveBitMap.GetInfo()
+                    bmpstr = saveBitMap.GetBitmapBits(True)
+                    img = np.frombuffer(bmpstr, dtype='uint8')
+                    img.shape = (bmpinfo['bmHeight'], bmpinfo['bmWidth'], 4)  # BGRA 格式
+
+                    # BGRX 转换为 BGR 格式，适用于 OpenCV
+                    img_bgr = cv2.cvtColor(img, cv2.COLOR_BGRA2BGR)
+
+                    self._pic = os.path.join(self.base_dir, 'current_screen.png')
+                    self._seq += 1
+                    snap = snapshot(img_bgr, self._seq)
+                    self._snapshot = snap
+
+                # 释放资源（截图失败时也要释放）
+                win32gui.DeleteObject(saveBitMap.GetHandle())
+                saveDC.DeleteDC()
+                dcObj.DeleteDC()
+                win32gui.ReleaseDC(self._hwnd, wDC)
+
+                if result != 1:
+                    log.warning('Failed to capture the screen.')
+
+        if snap is not None:
+            # 保存截图
+            self.save_snapshot(snap)
+            log.info('Capture the current screen...')